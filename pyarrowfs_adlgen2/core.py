@@ -15,24 +15,187 @@ it is recommended to use the SDK separately to use this sort of functionality.
 """
 
 import os
+import email.utils
+import collections
 import datetime
+import functools
 import io
 import typing
 import dataclasses
+import concurrent.futures
+import threading
+import time
 
 import azure.core.exceptions
+import azure.core.pipeline.transport
 import azure.storage.filedatalake
+import requests
+import requests.adapters
+import urllib3.util.retry
 from azure.storage.filedatalake import ContentSettings
 import pyarrow.fs
 
-
+# Looked up once per listed path, so avoid resolving the attributes every time
+_DIRECTORY = pyarrow.fs.FileType.Directory
+_FILE = pyarrow.fs.FileType.File
+
+# Shared by the handlers for operations that make many independent requests at once,
+# like looking up many paths, listing file systems or deleting the contents of a directory
+_FANOUT_POOL = concurrent.futures.ThreadPoolExecutor(
+    max_workers=int(os.environ.get('PYARROWFS_ADLGEN2_STAT_WORKERS', 16)),
+    thread_name_prefix='pyarrowfs-adlgen2-fanout'
+)
+
+
+# Guards the lazy creation of the transfer pools of the handlers
+_TRANSFER_POOL_LOCK = threading.Lock()
+
+
+def _fanout(func, items):
+    # Each call is a separate request, so only bother with threads when there is more than one.
+    # Calls made from a task already running on the pool run in that thread, waiting for the
+    # pool from within it could deadlock once every worker is waiting.
+    if len(items) <= 1 or threading.current_thread().name.startswith('pyarrowfs-adlgen2-fanout'):
+        return [func(item) for item in items]
+    return list(_FANOUT_POOL.map(func, items))
+
+
+class _PooledHTTPAdapter(requests.adapters.HTTPAdapter):
+    # Send request bodies in 32 KiB blocks rather than the 8 KiB default of http.client,
+    # like the adapter azure-core mounts in the sessions it creates itself
+    BLOCK_SIZE = 32 * 2 ** 10
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs.setdefault('blocksize', self.BLOCK_SIZE)
+        super().init_poolmanager(*args, **kwargs)
+
+
+def _pooled_transport(pool_size=64):
+    # The default transport keeps only 10 connections per host, far fewer than the number of
+    # requests the thread pools make at once, so most of them would pay for a new TLS handshake.
+    # Retries are left to the SDK pipeline, like in the default transport.
+    adapter = _PooledHTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=urllib3.util.retry.Retry(total=False, redirect=False, raise_on_status=False)
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return azure.core.pipeline.transport.RequestsTransport(session=session)
+
+
+def _server_side_copy(source_client, dest_client, timeout=None, copy_timeout=None):
+    # Data lake file clients wrap a blob client for the same path, and the blob API can copy
+    # within the service, so the data never passes through this process. Returns False if the
+    # copy could not be done that way, f. ex. because the credential can not authorize the
+    # source, and the caller should copy the data itself.
+    source = getattr(source_client, '_blob_client', None)
+    dest = getattr(dest_client, '_blob_client', None)
+    if source is None or dest is None:
+        return False
+    try:
+        copy = dest.start_copy_from_url(source.url, timeout=timeout)
+    except azure.core.exceptions.HttpResponseError as e:
+        # Refused, f. ex. because the service can not use the credential to read the source.
+        # Other errors, like throttling or server errors, are not solved by copying here.
+        if e.status_code != 403 and getattr(e, 'error_code', None) != 'CannotVerifyCopySource':
+            raise
+        return False
+    status = copy['copy_status']
+    deadline = None if copy_timeout is None else time.monotonic() + copy_timeout
+    delay = 0.05
+    try:
+        while status == 'pending':
+            if deadline is not None and time.monotonic() >= deadline:
+                dest.abort_copy(copy, timeout=timeout)
+                raise TimeoutError(
+                    f'Copy to {dest.url} did not finish within {copy_timeout} seconds'
+                )
+            time.sleep(delay)
+            delay = min(delay * 2, 1.0)
+            status = dest.get_blob_properties(timeout=timeout).copy.status
+    except azure.core.exceptions.HttpResponseError as e:
+        # Other errors may leave the copy running on the service, so copying the data here
+        # as well could race with it
+        if e.status_code != 403:
+            raise
+        return False
+    return status == 'success'
+
+
+def _is_directory(properties):
+    # Directories are stored as empty blobs marked with this metadata entry
+    return (properties.metadata or {}).get('hdi_isfolder') == 'true'
+
+
+_MONTHS = {
+    name: number for number, name in enumerate(
+        ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'),
+        start=1
+    )
+}
+
+
+# Parsing is slow enough to show up when listing large datasets, and many files
+# in a listing usually share the same timestamp
+@functools.lru_cache(maxsize=4096)
 def _parse_azure_ts(last_modified):
     # Mon, 17 Aug 2020 12:19:35 GMT
-    if isinstance(last_modified, str):
-        fmt = "%a, %d %b %Y %H:%M:%S %Z"
-        return datetime.datetime.strptime(last_modified, fmt)
-    else:
+    if not isinstance(last_modified, str):
         return last_modified
+    month = _MONTHS.get(last_modified[8:11])
+    if len(last_modified) != 29 or month is None or not last_modified.endswith(' GMT'):
+        # Not the fixed width form the service sends, leave it to the general RFC 2822 parser
+        return email.utils.parsedate_to_datetime(last_modified).astimezone(datetime.timezone.utc)
+    return datetime.datetime(
+        int(last_modified[12:16]), month, int(last_modified[5:7]),
+        int(last_modified[17:19]), int(last_modified[20:22]), int(last_modified[23:25]),
+        tzinfo=datetime.timezone.utc
+    )
+
+
+# Paths are normalized and split on every call into the handlers, often repeatedly for the same
+# paths during dataset discovery. These are pure functions of the path, so they are safe to cache.
+@functools.lru_cache(maxsize=8192)
+def _normalize_path(path):
+    if path and (path[0] == '/' or path[-1] == '/'):
+        return path.strip('/')
+    return path
+
+
+@functools.lru_cache(maxsize=8192)
+def _prefix_path(file_system_name, path):
+    return f'{file_system_name}/{path}' if path else file_system_name
+
+
+@functools.lru_cache(maxsize=8192)
+def _split_account_path(path):
+    path = _normalize_path(path)
+    fs_name, _, path = path.partition('/')
+    if path.endswith('/'):
+        raise ValueError(f'{path} is an illegal path (may not end with /)')
+    return fs_name, path
+
+
+def _build_file_infos(listing, prefix):
+    # Equivalent to FilesystemHandler._create_file_info for every path in the listing. This runs
+    # once per listed path, so everything used in the loop is bound to locals up front.
+    file_info, parse_ts, directory, file = pyarrow.fs.FileInfo, _parse_azure_ts, _DIRECTORY, _FILE
+    return [
+        file_info(
+            prefix + path_properties.name,
+            directory if path_properties.is_directory else file,
+            size=path_properties.content_length,
+            mtime=parse_ts(path_properties.last_modified)
+        )
+        for path_properties in listing
+    ]
+
+
+def _dirname(path):
+    # Data lake paths are always separated by /, so skip the platform handling of os.path
+    return path.rpartition('/')[0]
 
 
 @dataclasses.dataclass
@@ -91,26 +254,44 @@ class DatalakeGen2File(io.IOBase):
     FilesystemHandler.open_* or AccountHandler.open_* methods.
     """
 
-    DEFAULT_BLOCK_SIZE = 5 * 2 ** 20
+    # Bytes buffered before they are uploaded. The service accepts up to 100 MiB per append.
+    DEFAULT_BLOCK_SIZE = int(os.environ.get('PYARROWFS_ADLGEN2_BLOCK_SIZE', 16 * 2 ** 20))
+    DEFAULT_CHUNK_SIZE = 4 * 2 ** 20
+    DEFAULT_MAX_CONCURRENCY = 2 * (os.cpu_count() or 1)
+    # Ranges closer than this are fetched with a single request by read_ranges
+    MAX_RANGE_GAP = 2 ** 20
 
     def __init__(self, file_client: azure.storage.filedatalake.DataLakeFileClient,
-                 mode='rb', block_size='default', timeouts=DEFAULT_TIMEOUTS):
+                 mode='rb', block_size='default', timeouts=DEFAULT_TIMEOUTS, size=None,
+                 max_concurrency='default', chunk_size='default', on_close=None, executor=None):
         super(DatalakeGen2File, self).__init__()
         self.timeouts = timeouts
         self.file_client = file_client
         self.mode = mode
         self.block_size = self.DEFAULT_BLOCK_SIZE if block_size == 'default' else block_size
+        self.max_concurrency = (
+            self.DEFAULT_MAX_CONCURRENCY if max_concurrency == 'default' else max_concurrency
+        )
+        self.chunk_size = self.DEFAULT_CHUNK_SIZE if chunk_size == 'default' else chunk_size
+        # Called once the file is closed, after written data has been committed
+        self.on_close = on_close
+        # Runs the parallel transfers. Handlers share theirs between the files they open,
+        # otherwise the file starts its own when it needs one, and shuts it down on close.
+        self._executor = executor
+        self._owns_executor = executor is None
+        # Appends that are still being uploaded, oldest first
+        self._pending = collections.deque()
         self.loc = 0
-        self.buffer = io.BytesIO()
+        self.buffer = bytearray()
         self.offset = None
-        self._eof = False
+        # Size of the file on the service, looked up at most once per handle
+        self._size = size
+        # In 'wb' mode, the file is created (or truncated) by the first flush
+        self._created = mode != 'wb'
 
         if mode not in {'ab', 'rb', 'wb'}:
             raise ValueError(f"File mode not supported: {mode}")
 
-        if self.mode == 'wb':
-            self.file_client.create_file()
-
     @document_timeout(
         azure.storage.filedatalake.DataLakeFileClient.get_file_properties,
         "file_client_timeout")
@@ -142,9 +323,101 @@ class DatalakeGen2File(io.IOBase):
         "file_client_timeout")
     def download_file(self, loc, length):
         return self.file_client.download_file(
-            loc, length, timeout=self.timeouts.file_client_timeout
+            loc, length, max_concurrency=self.max_concurrency,
+            timeout=self.timeouts.file_client_timeout
         )
 
+    def _pool(self):
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.max_concurrency
+            )
+        return self._executor
+
+    def _append_chunks(self, data, offset, length):
+        # Each chunk is appended at its own offset, so they can be uploaded in any order
+        # while the next block is buffered, and committed together by the next flush_data call.
+        if self.max_concurrency <= 1:
+            self.append_data(data, offset, length)
+            return
+        view = memoryview(data)
+        for start in range(0, length, self.chunk_size):
+            # Bound the number of uploads, and so the memory, in flight for this file
+            while len(self._pending) >= self.max_concurrency:
+                self._pending.popleft().result()
+            self._pending.append(self._pool().submit(
+                self._append_view, view[start:start + self.chunk_size], offset + start
+            ))
+
+    def _append_view(self, view, offset):
+        with view:
+            return self.append_data(view, offset, len(view))
+
+    def _wait_for_appends(self):
+        while self._pending:
+            self._pending.popleft().result()
+
+    def close(self):
+        was_closed = self.closed
+        try:
+            if not was_closed and self.mode in {'wb', 'ab'}:
+                self.explicit_flush()
+        finally:
+            try:
+                super(DatalakeGen2File, self).close()
+            finally:
+                if self._owns_executor and self._executor is not None:
+                    self._executor.shutdown()
+                    self._executor = None
+                if not was_closed and self.on_close is not None:
+                    self.on_close()
+
+    def _get_size(self):
+        if self._size is None:
+            self._size = self.get_file_properties().size
+        return self._size
+
+    def read_ranges(self, ranges):
+        """Read several ranges of the file at once
+
+        Ranges that overlap or are less than MAX_RANGE_GAP bytes apart are merged and fetched
+        with a single request, and the requests are made in parallel. The position of the
+        file is not changed.
+
+        :param ranges: list of (offset, length) tuples
+        :return: list with the data for each range, in the same order as `ranges`
+        """
+        if self.mode != 'rb':
+            raise ValueError("File not in read mode")
+        if self.closed:
+            raise ValueError('I/O on closed file')
+        size = self._get_size()
+        merged = []  # [start, end] of each request
+        placement = [None] * len(ranges)  # index into merged for each range
+        for index in sorted(range(len(ranges)), key=lambda i: ranges[i][0]):
+            offset, length = ranges[index]
+            end = min(offset + length, size)
+            if merged and offset - merged[-1][1] < self.MAX_RANGE_GAP:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([offset, end])
+            placement[index] = len(merged) - 1
+        futures = [
+            self._pool().submit(self._download_range, start, end)
+            for start, end in merged
+        ]
+        fetched = [future.result() for future in futures]
+        result = []
+        for (offset, length), index in zip(ranges, placement):
+            start = offset - merged[index][0]
+            result.append(fetched[index][start:start + length])
+        return result
+
+    def _download_range(self, start, end):
+        if end <= start:
+            return b''
+        return self.download_file(start, end - start).readall()
+
     def tell(self):
         return self.loc
 
@@ -158,7 +431,7 @@ class DatalakeGen2File(io.IOBase):
         elif whence == 1:
             new_loc = self.loc + loc
         else:
-            new_loc = self.get_file_properties().size + loc
+            new_loc = self._get_size() + loc
         if new_loc < 0:
             raise ValueError("Seek before start of file")
         self.loc = new_loc
@@ -169,9 +442,12 @@ class DatalakeGen2File(io.IOBase):
             raise ValueError("File not in write mode")
         if self.closed:
             raise ValueError("Attempted I/O on closed file")
-        out = self.buffer.write(data)
+        # Count bytes, not items, like io.BytesIO does for f. ex. arrays of ints
+        with memoryview(data) as view:
+            out = view.nbytes
+        self.buffer.extend(data)
         self.loc += out
-        if self.buffer.tell() >= self.block_size:
+        if len(self.buffer) >= self.block_size:
             self.flush()
         return out
 
@@ -179,40 +455,185 @@ class DatalakeGen2File(io.IOBase):
         return self.mode in {'wb', 'ab'}
 
     def flush(self):
+        """Upload buffered data
+
+        Uploaded data becomes part of the file when it is committed, which happens
+        when the file is closed or by calling :meth:`explicit_flush`.
+        """
         if self.closed:
             raise ValueError("Flush on closed file")
         if self.mode not in {'wb', 'ab'}:
             return
 
+        if not self._created:
+            # Closing flushes, so a file that is opened and closed without writes
+            # still ends up empty
+            self.file_client.create_file()
+            self._created = True
+
         if self.offset is None:
             if self.mode == 'ab':
-                self.offset = self.get_file_properties().size
+                self.offset = self._get_size()
             else:
                 self.offset = 0
 
-        data, length = self.buffer.getvalue(), self.buffer.tell()
+        # Hand the filled buffer over to the uploads without copying it, and write to a new one
+        data, self.buffer = self.buffer, bytearray()
+        length = len(data)
         if length > 0:
-            self.append_data(data, self.offset, length)
+            self._append_chunks(data, self.offset, length)
         self.offset += length
-        self.flush_data(self.offset)
-        self.buffer = io.BytesIO()
+
+    def explicit_flush(self):
+        """Upload buffered data and commit everything written so far to the file"""
+        self.flush()
+        if self.mode in {'wb', 'ab'}:
+            self._wait_for_appends()
+            self.flush_data(self.offset)
+            # Everything written so far is committed, so the size is known without asking
+            self._size = self.offset
 
     def read(self, length=-1):
+        return bytes(self._read(length))
+
+    def _read(self, length=-1):
+        # Like read, but returns the buffer the data was downloaded into, for callers
+        # that can use it without copying it to bytes
+        if self.closed:
+            raise ValueError('I/O on closed file')
+        if self.mode != 'rb':
+            raise ValueError("File not in read mode")
+        if length == 0:
+            return b''
+        # arrow probes at and past the end of the file, answer those without a request
+        remaining = self._get_size() - self.loc
+        if remaining <= 0:
+            return b''
+        if length is None or length < 0 or length > remaining:
+            length = remaining
+        data = self._download_into(self.loc, length)
+        self.loc += len(data)
+        return data
+
+    def read_at(self, nbytes, offset):
+        """Read up to `nbytes` bytes at `offset`, without changing the position of the file"""
+        if self.closed:
+            raise ValueError('I/O on closed file')
         if self.mode != 'rb':
             raise ValueError("File not in read mode")
+        nbytes = min(nbytes, self._get_size() - offset)
+        if nbytes <= 0:
+            return b''
+        return bytes(self._download_into(offset, nbytes))
+
+    def _download_into(self, start, length):
+        # Fill a preallocated buffer as the body arrives, instead of joining it all at the end.
+        # A single connection is slow for large reads, so those are split into chunk_size
+        # ranges that are downloaded in parallel. Returns the bytearray.
+        data = bytearray(length)
+        with memoryview(data) as view:
+            if length <= self.chunk_size or self.max_concurrency <= 1:
+                filled = self._download_range_into(view, start)
+            else:
+                futures = [
+                    self._pool().submit(
+                        self._download_range_into, view[rel:rel + self.chunk_size], start + rel
+                    )
+                    for rel in range(0, length, self.chunk_size)
+                ]
+                filled = sum(future.result() for future in futures)
+                del futures
+        if filled < length:
+            del data[filled:]
+        return data
+
+    def _download_range_into(self, view, start):
+        filled = 0
+        for chunk in self.download_file(start, len(view)).chunks():
+            view[filled:filled + len(chunk)] = chunk
+            filled += len(chunk)
+        return filled
+
+
+class DatalakeGen2RandomAccessFile(DatalakeGen2File):
+    """Read files from Azure Data Lake gen2 at arbitrary offsets.
+
+    The parquet reader starts by reading the footer at the end of the file, and then
+    issues many small reads around the metadata before fetching column chunks. To
+    avoid one request per read, the tail of the file is downloaded when it is opened,
+    and small reads that miss the cached data fetch at least `range_size` bytes,
+    so that the neighbouring reads that usually follow are served from memory.
+
+    Normally, you would not use this directly but get an instance from either
+    FilesystemHandler.open_input_file or AccountHandler.open_input_file.
+    """
+
+    DEFAULT_TAIL_SIZE = 64 * 2 ** 10
+    # Parquet footers with many row groups or columns easily outgrow the default tail
+    PARQUET_TAIL_SIZE = 256 * 2 ** 10
+    PARQUET_SUFFIXES = ('.parquet', '.parq', '.pq')
+    DEFAULT_RANGE_SIZE = 2 ** 20
+
+    def __init__(self, file_client: azure.storage.filedatalake.DataLakeFileClient,
+                 size=None, timeouts=DEFAULT_TIMEOUTS, max_concurrency='default',
+                 chunk_size='default', tail_size='default', range_size='default', executor=None):
+        super(DatalakeGen2RandomAccessFile, self).__init__(
+            file_client, mode='rb', timeouts=timeouts, size=size,
+            max_concurrency=max_concurrency, chunk_size=chunk_size, executor=executor
+        )
+        self.tail_size = self.DEFAULT_TAIL_SIZE if tail_size == 'default' else tail_size
+        self.range_size = self.DEFAULT_RANGE_SIZE if range_size == 'default' else range_size
+        # (start, data) of the ranges kept in memory: the tail, and the most recent fetch
+        self._tail = (0, b'')
+        self._recent = (0, b'')
+
+        size = self._get_size()
+        if size > 0 and self.tail_size > 0:
+            start = max(size - self.tail_size, 0)
+            self._tail = (start, self.download_file(start, size - start).readall())
+
+    def _cached(self, offset, end):
+        for start, data in (self._tail, self._recent):
+            if start <= offset and end <= start + len(data):
+                return data[offset - start:end - start]
+        return None
+
+    def read_at(self, nbytes, offset):
         if self.closed:
             raise ValueError('I/O on closed file')
-        if length < 0 or length is None:
-            length = self.get_file_properties().size - self.loc
-        if length == 0 or self._eof:
+        end = min(offset + nbytes, self._get_size())
+        if end <= offset:
             return b''
-        data = self.download_file(self.loc, length).readall()
-        if len(data) < length:
-            self._eof = True
+        data = self._cached(offset, end)
+        if data is not None:
+            return data
+        if end - offset >= self.range_size:
+            # Large reads are typically whole column chunks, there is nothing to coalesce
+            return bytes(self._download_into(offset, end - offset))
+        fetch_end = min(offset + self.range_size, self._get_size())
+        self._recent = (offset, self.download_file(offset, fetch_end - offset).readall())
+        return self._recent[1][:end - offset]
+
+    def read(self, length=-1):
+        if self.closed:
+            raise ValueError('I/O on closed file')
+        if length is None or length < 0:
+            length = self._get_size() - self.loc
+        data = self.read_at(length, self.loc)
         self.loc += len(data)
         return data
 
 
+def _copy_stream(source, out):
+    # Copy a block at a time, so that large files don't have to fit in memory. Reading a full
+    # block means each write fills the output buffer and starts uploading it right away.
+    while True:
+        chunk = source.read(DatalakeGen2File.DEFAULT_BLOCK_SIZE)
+        if not chunk:
+            break
+        out.write(chunk)
+
+
 class FilesystemHandler(pyarrow.fs.FileSystemHandler):
     """
     Handler for a single file system within an azure storage account.
@@ -221,16 +642,31 @@ class FilesystemHandler(pyarrow.fs.FileSystemHandler):
     that has access only to a single file system.
     """
 
+    # Seconds to keep directory listings around, set listing_ttl on an instance to change it,
+    # or to 0 to always list from the service
+    DEFAULT_LISTING_TTL = 1.0
+    LISTING_CACHE_SIZE = 256
+    # open_input_file downloads files up to this size whole, and serves them from memory
+    SMALL_FILE_SIZE = 16 * 2 ** 20
+    # Seconds to wait for the service to copy a file, before the copy is aborted
+    COPY_TIMEOUT = 600
+
     def __init__(
             self,
             file_system_client: azure.storage.filedatalake.FileSystemClient,
             prefix_fs=False,
-            timeouts=DEFAULT_TIMEOUTS
+            timeouts=DEFAULT_TIMEOUTS,
+            max_concurrency='default',
+            chunk_size='default'
     ):
         """
         :param file_system_client:
         :param prefix_fs: If True, prefix the name of the file system to all generated paths
         :param timeouts: :class:`Timeouts` for datalake gen2 operations
+        :param max_concurrency: Number of parallel requests used to transfer a single
+            read or write of a file, and in total for the files open in a file system
+        :param chunk_size: Size in bytes of the pieces a write is split into when
+            uploaded in parallel
         :type file_system_client: azure.storage.filedatalake.FileSystemClient
         :type prefix_fs: bool
 
@@ -240,14 +676,75 @@ class FilesystemHandler(pyarrow.fs.FileSystemHandler):
         self.prefix_fs = prefix_fs
         self.file_system_client = file_system_client
         self.timeouts = timeouts
+        self.max_concurrency = max_concurrency
+        self.chunk_size = chunk_size
+        self.partition_filter = None
+        # Shared by the files opened through this handler, started by _transfer_pool
+        self._transfer_executor = None
+        self.listing_ttl = self.DEFAULT_LISTING_TTL
+        self._init_file_client_cache()
+        self._init_listing_cache()
+
+    def _init_file_client_cache(self):
+        # Creating a client sets up its own request pipeline, so reuse them for paths seen recently
+        self._file_client = functools.lru_cache(maxsize=1024)(
+            self.file_system_client.get_file_client
+        )
+
+    def _init_listing_cache(self):
+        # directory -> (expiry, listing), least recently used first
+        self._listing_cache = collections.OrderedDict()
+        self._listing_lock = threading.Lock()
+        # Bumped by invalidate, so that listings started before it are not cached
+        self._listing_generation = 0
+
+    def __getstate__(self):
+        # Handlers are pickled to send file systems to other processes, f. ex. by dask,
+        # leave out what only makes sense in this process
+        state = self.__dict__.copy()
+        state['_transfer_executor'] = None
+        for name in ('_file_client', '_listing_cache', '_listing_lock', '_listing_generation'):
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_file_client_cache()
+        self._init_listing_cache()
+
+    def _transfer_pool(self):
+        # Shared by the files opened through this handler, so that writing many files at once,
+        # f. ex. the partitions of a dataset, does not start a pool of threads for each of them
+        if self._transfer_executor is None:
+            with _TRANSFER_POOL_LOCK:
+                if self._transfer_executor is None:
+                    self._transfer_executor = concurrent.futures.ThreadPoolExecutor(
+                        max_workers=max(
+                            DatalakeGen2File.DEFAULT_MAX_CONCURRENCY
+                            if self.max_concurrency == 'default' else self.max_concurrency, 1
+                        ),
+                        thread_name_prefix='pyarrowfs-adlgen2-transfer'
+                    )
+        return self._transfer_executor
+
+    def set_partition_filter(self, path_filter: typing.Optional[typing.Callable[[str], bool]]):
+        """Only descend into some directories when listing recursively
+
+        Recursive listings with `get_file_info_selector` only enter directories for which
+        `path_filter` returns True, and leave out directories for which it returns False.
+        The filter is called with the path of the directory as it appears in the listing.
+
+        Use this to avoid listing partitions of a hive partitioned dataset that a
+        subsequent filter would discard anyway. Set to None to list everything.
+
+        :param path_filter: callable taking a path and returning a bool, or None
+        """
+        self.partition_filter = path_filter
 
     def _prefix(self, path):
-        if self.prefix_fs and path:
-            return f'{self.file_system_client.file_system_name}/{path}'
-        elif self.prefix_fs and not path:
-            return self.file_system_client.file_system_name
-        else:
+        if not self.prefix_fs:
             return path
+        return _prefix_path(self.file_system_client.file_system_name, path)
 
     @document_timeout(
         azure.storage.filedatalake.FileSystemClient.get_paths,
@@ -257,11 +754,53 @@ class FilesystemHandler(pyarrow.fs.FileSystemHandler):
             path, recursive=recursive, timeout=self.timeouts.file_system_timeout
         )
 
+    def _cached_get_paths(self, path):
+        # Only listings of a single directory are kept. A recursive listing can cover a whole
+        # dataset, and is converted a page at a time instead, see _list_selected.
+        now = time.monotonic()
+        with self._listing_lock:
+            entry = self._listing_cache.get(path)
+            if entry is not None and entry[0] >= now:
+                self._listing_cache.move_to_end(path)
+                return entry[1]
+            generation = self._listing_generation
+        listing = tuple(self.get_paths(path, recursive=False))
+        with self._listing_lock:
+            if self.listing_ttl > 0 and generation == self._listing_generation:
+                # Drop expired listings, instead of holding on to them until they are evicted
+                expired = [key for key, (expiry, _) in self._listing_cache.items() if expiry < now]
+                for key in expired:
+                    del self._listing_cache[key]
+                self._listing_cache[path] = (now + self.listing_ttl, listing)
+                self._listing_cache.move_to_end(path)
+                while len(self._listing_cache) > self.LISTING_CACHE_SIZE:
+                    self._listing_cache.popitem(last=False)
+        return listing
+
+    def invalidate(self, path=''):
+        """Forget cached directory listings that may include `path`
+
+        The handler calls this for changes it makes itself. Call it after changing
+        the file system by other means, to see the change before the listings expire.
+
+        :param path: changed path, or the empty string to forget every listing
+        """
+        path = self.normalize_path(path)
+        with self._listing_lock:
+            self._listing_generation += 1
+            if not path:
+                self._listing_cache.clear()
+                return
+            for listed in list(self._listing_cache):
+                if (not listed or path == listed or path.startswith(listed + '/')
+                        or listed.startswith(path + '/')):
+                    del self._listing_cache[listed]
+
     @document_timeout(
         azure.storage.filedatalake.DataLakeFileClient.rename_file,
         "file_client_timeout")
     def rename_file(self, src_path, dest_path):
-        return self.file_system_client.get_file_client(src_path).rename_file(
+        return self._file_client(src_path).rename_file(
             dest_path, timeout=self.timeouts.file_client_timeout
         )
 
@@ -288,11 +827,20 @@ class FilesystemHandler(pyarrow.fs.FileSystemHandler):
             path, timeout=self.timeouts.file_system_timeout
         )
 
+    @document_timeout(
+        azure.storage.filedatalake.DataLakeFileClient.get_file_properties,
+        "file_client_timeout")
+    def get_file_properties(self, path):
+        # This works for directories too, they are distinguished by their metadata
+        return self._file_client(path).get_file_properties(
+            timeout=self.timeouts.file_client_timeout
+        )
+
     @document_timeout(
         azure.storage.filedatalake.DataLakeFileClient.delete_file,
         "file_client_timeout")
     def delete_file_(self, path):
-        return self.file_system_client.get_file_client(path).delete_file(
+        return self._file_client(path).delete_file(
             timeout=self.timeouts.file_client_timeout
         )
 
@@ -302,7 +850,9 @@ class FilesystemHandler(pyarrow.fs.FileSystemHandler):
             account_name,
             file_system_name,
             credential=None,
-            timeouts=DEFAULT_TIMEOUTS
+            timeouts=DEFAULT_TIMEOUTS,
+            max_concurrency='default',
+            chunk_size='default'
     ):
         """
         Create from storage account name, file system name and credential
@@ -312,6 +862,10 @@ class FilesystemHandler(pyarrow.fs.FileSystemHandler):
         :param credential: Any valid valid value to pass as credential to
             azure.storage.filedatalake.FileSystemClient
         :param timeouts: :class:`Timeouts` for datalake gen2 operations
+        :param max_concurrency: Number of parallel requests used to transfer a single
+            read or write of a file, and in total for the files open in a file system
+        :param chunk_size: Size in bytes of the pieces a write is split into when
+            uploaded in parallel
         :type credential: str for SAS tokens, None for public access,
             any credential from azure.identity
         :return: FilesystemHandler
@@ -319,9 +873,12 @@ class FilesystemHandler(pyarrow.fs.FileSystemHandler):
         client = azure.storage.filedatalake.FileSystemClient(
             f'https://{account_name}.dfs.core.windows.net',
             file_system_name,
-            credential=credential
+            credential=credential,
+            transport=_pooled_transport()
+        )
+        return cls(
+            client, timeouts=timeouts, max_concurrency=max_concurrency, chunk_size=chunk_size
         )
-        return cls(client, timeouts=timeouts)
 
     def __eq__(self, other):
         if isinstance(other, FilesystemHandler):
@@ -342,16 +899,16 @@ class FilesystemHandler(pyarrow.fs.FileSystemHandler):
         return f"abfs+{self.file_system_client.account_name}/{self.file_system_client.file_system_name}"
 
     def normalize_path(self, path: str):
-        return path.lstrip('/').rstrip('/')
+        return _normalize_path(path)
 
     def _create_file_info(
             self,
             path_properties: azure.storage.filedatalake._models.PathProperties
     ):
         if path_properties.is_directory:
-            path_type = pyarrow.fs.FileType.Directory
+            path_type = _DIRECTORY
         else:
-            path_type = pyarrow.fs.FileType.File
+            path_type = _FILE
         return pyarrow.fs.FileInfo(
             self._prefix(path_properties.name),
             path_type,
@@ -363,20 +920,22 @@ class FilesystemHandler(pyarrow.fs.FileSystemHandler):
         if path in {'', '/'}:
             # The root always exists
             return
+        # Looked up through _get_file_info, which falls back to listing the parent
+        # when the credential may not read the properties of the path
         try:
-            parent = os.path.dirname(path)
-            path_property_result = self.get_paths(parent, recursive=False)
-            for path_properties in path_property_result:
-                if path_properties.name == path:
-                    if not path_properties.is_directory:
-                        raise NotADirectoryError(self._prefix(path))
-                    return
+            info = self._get_file_info(path)
+        except FileNotFoundError:
+            # A missing path within an existing directory is reported as not being a directory,
+            # a path with a missing parent as not being found
+            parent = _dirname(path)
+            if parent:
+                try:
+                    self._get_file_info(parent)
+                except FileNotFoundError:
+                    raise FileNotFoundError(self._prefix(path))
+            raise NotADirectoryError(self._prefix(path))
+        if info.type != _DIRECTORY:
             raise NotADirectoryError(self._prefix(path))
-        except azure.core.exceptions.HttpResponseError as e:
-            if e.status_code == 404:
-                raise FileNotFoundError(self._prefix(path))
-            else:
-                raise
 
     def _get_file_info(self, path):
         if not path.lstrip('/'):
@@ -384,61 +943,181 @@ class FilesystemHandler(pyarrow.fs.FileSystemHandler):
                 self.file_system_client.file_system_name if self.prefix_fs else '',
                 pyarrow.fs.FileType.Directory
             )
-        parent = os.path.dirname(path)
-        listing = self.get_paths(parent, recursive=False)
-        for path_properties in listing:
-            if path_properties.name == path:
-                return self._create_file_info(path_properties)
-        raise FileNotFoundError(self._prefix(path))
+        try:
+            properties = self.get_file_properties(path)
+        except azure.core.exceptions.ResourceNotFoundError:
+            raise FileNotFoundError(self._prefix(path))
+        except azure.core.exceptions.HttpResponseError as e:
+            if e.status_code != 403:
+                raise
+            # Access control lists can allow listing a directory without allowing
+            # to read the properties of its children, so look for it in the listing
+            return self._get_listed_file_info(path)
+        if _is_directory(properties):
+            path_type = _DIRECTORY
+        else:
+            path_type = _FILE
+        return pyarrow.fs.FileInfo(
+            self._prefix(path),
+            path_type,
+            size=properties.size,
+            mtime=_parse_azure_ts(properties.last_modified)
+        )
+
+    def _get_listed_file_info(self, path):
+        if self.listing_ttl > 0:
+            info = self._list_file_infos(_dirname(path)).get(self._prefix(path))
+        else:
+            # Nothing will reuse the listing, so stop at the first match instead of paging
+            # through the rest of the directory
+            try:
+                listing = self.get_paths(_dirname(path), recursive=False)
+                match = next((props for props in listing if props.name == path), None)
+            except azure.core.exceptions.ResourceNotFoundError:
+                match = None
+            info = None if match is None else self._create_file_info(match)
+        if info is None:
+            raise FileNotFoundError(self._prefix(path))
+        return info
 
     def get_file_info(self, paths: [str]):
-        return [
-            self._get_file_info(self.normalize_path(path)) for path in paths
-        ]
+        paths = [self.normalize_path(path) for path in paths]
+        # A single listing answers for every requested path in a directory, but a single
+        # path in a directory is cheaper to look up on its own
+        requested = collections.Counter(_dirname(path) for path in paths if path)
+        parents = [parent for parent, count in requested.items() if count > 1]
+        listed = {
+            parent: infos
+            for parent, infos in zip(parents, _fanout(self._try_list_file_infos, parents))
+            if infos is not None
+        }
+
+        def file_info(path):
+            parent = _dirname(path)
+            if not path or parent not in listed:
+                return self._get_file_info(path)
+            try:
+                return listed[parent][self._prefix(path)]
+            except KeyError:
+                raise FileNotFoundError(self._prefix(path))
 
-    def get_file_info_selector(self, selector: pyarrow.fs.FileSelector):
+        return _fanout(file_info, paths)
+
+    def _try_list_file_infos(self, directory):
         try:
-            self._verify_is_dir(self.normalize_path(selector.base_dir))
-        except FileNotFoundError:
-            if selector.allow_not_found:
-                return []
-            else:
+            return self._list_file_infos(directory)
+        except azure.core.exceptions.HttpResponseError as e:
+            if e.status_code != 403:
                 raise
+            # Access control lists can allow reading the properties of paths without allowing
+            # to list their directory, so leave them to be looked up one at a time
+            return None
 
-        listing = self.get_paths(
-            self.normalize_path(selector.base_dir),
-            recursive=selector.recursive
-        )
+    def _list_file_infos(self, directory):
+        try:
+            listing = self._cached_get_paths(directory)
+        except azure.core.exceptions.ResourceNotFoundError:
+            return {}
+        prefix = f'{self.file_system_client.file_system_name}/' if self.prefix_fs else ''
+        return {info.path: info for info in _build_file_infos(listing, prefix)}
 
-        return [
-            self._create_file_info(path_properties)
-            for path_properties in listing
-        ]
+    def get_file_info_selector(self, selector: pyarrow.fs.FileSelector):
+        base_dir = self.normalize_path(selector.base_dir)
+        # List right away, and only look closer at the base directory if the listing fails
+        try:
+            infos = self._list_selected(base_dir, selector.recursive)
+        except azure.core.exceptions.ResourceNotFoundError:
+            try:
+                self._verify_is_dir(base_dir)
+            except FileNotFoundError:
+                if selector.allow_not_found:
+                    return []
+                raise
+            raise FileNotFoundError(self._prefix(base_dir))
+        if base_dir and len(infos) == 1 and infos[0].is_file:
+            # Listing a file lists the file itself
+            if infos[0].path == self._prefix(base_dir):
+                raise NotADirectoryError(self._prefix(base_dir))
+        return infos
+
+    def _list_selected(self, base_dir, recursive):
+        if recursive and self.partition_filter is not None:
+            return self._get_file_info_filtered(base_dir)
+
+        prefix = f'{self.file_system_client.file_system_name}/' if self.prefix_fs else ''
+        if not recursive and self.listing_ttl > 0:
+            return _build_file_infos(self._cached_get_paths(base_dir), prefix)
+
+        listing = self.get_paths(base_dir, recursive=recursive)
+        # Convert a page at a time, so the SDK objects of a page can be released
+        # before the next one is fetched
+        pages = listing.by_page() if hasattr(listing, 'by_page') else [listing]
+        result = []
+        for page in pages:
+            result.extend(_build_file_infos(page, prefix))
+        return result
+
+    def _get_file_info_filtered(self, base_dir):
+        # Walk the tree one level at a time, listing the directories of each level in parallel
+        infos = []
+        directories = [base_dir]
+        while directories:
+            listings = _fanout(self._cached_get_paths, directories)
+            directories = []
+            for listing in listings:
+                for path_properties in listing:
+                    info = self._create_file_info(path_properties)
+                    if path_properties.is_directory:
+                        if not self.partition_filter(info.path):
+                            continue
+                        directories.append(path_properties.name)
+                    infos.append(info)
+        return infos
 
     def create_dir(self, path, recursive):
         path = self.normalize_path(path)
         if recursive:
             self.create_directory(path)
         else:
-            parent = os.path.dirname(path)
+            parent = _dirname(path)
             self._verify_is_dir(parent)
             self.create_directory(path)
+        self.invalidate(path)
 
     def delete_dir(self, path):
         path = self.normalize_path(path)
         self._verify_is_dir(path)
-        self.delete_directory(path)
+        try:
+            self.delete_directory(path)
+        finally:
+            self.invalidate(path)
 
     def delete_dir_contents(self, path, accept_root_dir=False):
         path = self.normalize_path(path)
-        self._verify_is_dir(path)
         if not accept_root_dir and path in {'', '/'}:
             raise ValueError('Attempt to delete root dir with accept_root_dir=False')
-        for path_properties in self.get_paths(path, recursive=False):
-            if path_properties.is_directory:
-                self.delete_directory(path_properties.name)
-            else:
-                self.delete_file_(path_properties.name)
+        # Not from the listing cache, a stale listing would leave new children behind
+        try:
+            children = list(self.get_paths(path, recursive=False))
+        except azure.core.exceptions.ResourceNotFoundError:
+            self._verify_is_dir(path)
+            raise FileNotFoundError(self._prefix(path))
+        if path and any(child.name == path for child in children):
+            # Listing a file lists the file itself, which must not be deleted here
+            raise NotADirectoryError(self._prefix(path))
+        if not children:
+            return
+        # The deletes are independent of each other, so issue them concurrently
+        try:
+            _fanout(self._delete_one, children)
+        finally:
+            self.invalidate(path)
+
+    def _delete_one(self, path_properties):
+        if path_properties.is_directory:
+            self.delete_directory(path_properties.name)
+        else:
+            self.delete_file_(path_properties.name)
 
     def delete_root_dir_contents(self):
         self.delete_dir_contents("")
@@ -448,7 +1127,10 @@ class FilesystemHandler(pyarrow.fs.FileSystemHandler):
         file_info: pyarrow.fs.FileInfo = self.get_file_info([path])[0]
         if not file_info.is_file:
             raise IsADirectoryError(self._prefix(path))
-        self.delete_file_(path)
+        try:
+            self.delete_file_(path)
+        finally:
+            self.invalidate(path)
 
     def move(self, src, dest):
         # This is a simple rename. Caveat: the dest path is not relative to the file_system,
@@ -456,10 +1138,14 @@ class FilesystemHandler(pyarrow.fs.FileSystemHandler):
         src = self.normalize_path(src)
         dest = self.normalize_path(dest)
         src_info = self.get_file_info([src])[0]
-        if src_info.type == pyarrow.fs.FileType.Directory:
-            self.rename_directory(src, self.file_system_client.file_system_name + '/' + dest)
-        else:
-            self.rename_file(src, self.file_system_client.file_system_name + '/' + dest)
+        try:
+            if src_info.type == pyarrow.fs.FileType.Directory:
+                self.rename_directory(src, self.file_system_client.file_system_name + '/' + dest)
+            else:
+                self.rename_file(src, self.file_system_client.file_system_name + '/' + dest)
+        finally:
+            self.invalidate(src)
+            self.invalidate(dest)
 
     def copy_file(self, src, dest):
         src = self.normalize_path(src)
@@ -471,22 +1157,49 @@ class FilesystemHandler(pyarrow.fs.FileSystemHandler):
         except FileNotFoundError as ignore: # noqa
             pass
 
-        # There is actually no API call to do this, so it must be implemented with read/write
+        self._verify_is_file(src)
+        if _server_side_copy(
+                self._file_client(src), self._file_client(dest),
+                self.timeouts.file_client_timeout, self.COPY_TIMEOUT):
+            self.invalidate(dest)
+            return
+
         with self.open_input_stream(src) as source:
             with self.open_output_stream(dest) as out:
-                out.write(source.read())
+                _copy_stream(source, out)
 
     def open_input_stream(self, path):
         path = self.normalize_path(path)
-        self._verify_is_file(path)
-        fc = self.file_system_client.get_file_client(path)
-        return pyarrow.PythonFile(DatalakeGen2File(fc, mode='rb', timeouts=self.timeouts))
+        info = self._verify_is_file(path)
+        fc = self._file_client(path)
+        return pyarrow.PythonFile(
+            DatalakeGen2File(fc, mode='rb', size=info.size, **self._file_options())
+        )
 
     def open_input_file(self, path):
         path = self.normalize_path(path)
-        self._verify_is_file(path)
-        fc = self.file_system_client.get_file_client(path)
-        return pyarrow.PythonFile(DatalakeGen2File(fc, mode='rb', timeouts=self.timeouts))
+        info = self._verify_is_file(path)
+        fc = self._file_client(path)
+        if info.size <= self.SMALL_FILE_SIZE:
+            # A single request is about as fast as the few small ones the reader would make,
+            # and arrow can then read from the buffer without calling back into python
+            with DatalakeGen2File(fc, size=info.size, **self._file_options()) as source:
+                return pyarrow.BufferReader(pyarrow.py_buffer(source._read()))
+        if path.endswith(DatalakeGen2RandomAccessFile.PARQUET_SUFFIXES):
+            tail_size = DatalakeGen2RandomAccessFile.PARQUET_TAIL_SIZE
+        else:
+            tail_size = 'default'
+        return pyarrow.PythonFile(DatalakeGen2RandomAccessFile(
+            fc, size=info.size, tail_size=tail_size, **self._file_options()
+        ))
+
+    def _file_options(self):
+        return dict(
+            timeouts=self.timeouts,
+            max_concurrency=self.max_concurrency,
+            chunk_size=self.chunk_size,
+            executor=self._transfer_pool()
+        )
 
     def _set_metadata(self, fc, metadata):
         if metadata:
@@ -517,9 +1230,12 @@ class FilesystemHandler(pyarrow.fs.FileSystemHandler):
         """
 
         path = self.normalize_path(path)
-        fc = self.file_system_client.get_file_client(path)
+        fc = self._file_client(path)
         self._set_metadata(fc, metadata)
-        return pyarrow.PythonFile(DatalakeGen2File(fc, mode='wb', timeouts=self.timeouts))
+        return pyarrow.PythonFile(DatalakeGen2File(
+            fc, mode='wb', on_close=functools.partial(self.invalidate, path),
+            **self._file_options()
+        ))
 
     def open_append_stream(self, path, metadata=None):
         """Return an open output stream
@@ -534,14 +1250,18 @@ class FilesystemHandler(pyarrow.fs.FileSystemHandler):
         :param metadata: `dict`
         """
         path = self.normalize_path(path)
-        fc = self.file_system_client.get_file_client(path)
+        fc = self._file_client(path)
         self._set_metadata(fc, metadata)
-        return pyarrow.PythonFile(DatalakeGen2File(fc, mode='ab', timeouts=self.timeouts))
+        return pyarrow.PythonFile(DatalakeGen2File(
+            fc, mode='ab', on_close=functools.partial(self.invalidate, path),
+            **self._file_options()
+        ))
 
     def _verify_is_file(self, path):
-        info = self.get_file_info([path])[0]
+        info = self._get_file_info(path)
         if not info.is_file:
             raise FileNotFoundError(self._prefix(path))
+        return info
 
     def to_fs(self):
         return pyarrow.fs.PyFileSystem(self)
@@ -553,17 +1273,27 @@ class AccountHandler(pyarrow.fs.FileSystemHandler):
     Use this to to access an Azure Storage account with hierarchial namespace enabled.
     """
 
+    # Seconds to trust that a file system seen in the account still exists
+    FILE_SYSTEM_CACHE_TTL = 30
+
     def __init__(
             self,
             datalake_service: azure.storage.filedatalake.DataLakeServiceClient,
             timeouts=DEFAULT_TIMEOUTS,
-            fs_handler_cls=FilesystemHandler
+            fs_handler_cls=FilesystemHandler,
+            max_concurrency='default',
+            chunk_size='default'
     ):
         """
         :param datalake_service: data lake account service
         :param timeouts: :class:`Timeouts` for datalake gen2 operations
         :param fs_handler_cls: How to create FilesystemHandlers for interacting with
-            individual file systems in this account
+            individual file systems in this account. It is called with the file system client,
+            prefix_fs and timeouts, and with max_concurrency and chunk_size when they are set
+        :param max_concurrency: Number of parallel requests used to transfer a single
+            read or write of a file, and in total for the files open in a file system
+        :param chunk_size: Size in bytes of the pieces a write is split into when
+            uploaded in parallel
         :type datalake_service: azure.storage.filedatalake.DataLakeServiceClient
 
         https://azuresdkdocs.blob.core.windows.net/$web/python/azure-storage-file-datalake/12.1.1/azure.storage.filedatalake.html#azure.storage.filedatalake.DataLakeServiceClient
@@ -573,6 +1303,11 @@ class AccountHandler(pyarrow.fs.FileSystemHandler):
         self.file_system_handlers = {}
         self.timeouts = timeouts
         self.fs_handler_cls = fs_handler_cls
+        self.max_concurrency = max_concurrency
+        self.chunk_size = chunk_size
+        self.partition_filter = None
+        # (expiry, names) for file systems known to exist, see _file_system_exists
+        self._fs_name_cache: typing.Optional[typing.Tuple[float, typing.Set[str]]] = None
 
     @classmethod
     def from_account_name(
@@ -580,7 +1315,9 @@ class AccountHandler(pyarrow.fs.FileSystemHandler):
             account_name,
             credential=None,
             timeouts=DEFAULT_TIMEOUTS,
-            fs_handler_cls=FilesystemHandler
+            fs_handler_cls=FilesystemHandler,
+            max_concurrency='default',
+            chunk_size='default'
     ):
         """
         Create from storage account name and credential
@@ -590,15 +1327,25 @@ class AccountHandler(pyarrow.fs.FileSystemHandler):
             azure.storage.filedatalake.FileSystemClient
         :param timeouts: :class:`Timeouts` for datalake gen2 operations
         :param fs_handler_cls: How to create FilesystemHandlers for interacting with
-            individual file systems in this account
+            individual file systems in this account. It is called with the file system client,
+            prefix_fs and timeouts, and with max_concurrency and chunk_size when they are set
+        :param max_concurrency: Number of parallel requests used to transfer a single
+            read or write of a file, and in total for the files open in a file system
+        :param chunk_size: Size in bytes of the pieces a write is split into when
+            uploaded in parallel
         :type credential: str for SAS tokens, None for public access, any credential
             from azure.identity
         :return: pyarrow.fs.FileSystemHandler"""
+        # File system clients created from the service share its transport and connections
         datalake_service = azure.storage.filedatalake.DataLakeServiceClient(
             f'https://{account_name}.dfs.core.windows.net',
-            credential
+            credential,
+            transport=_pooled_transport()
+        )
+        return cls(
+            datalake_service, timeouts, fs_handler_cls=fs_handler_cls,
+            max_concurrency=max_concurrency, chunk_size=chunk_size
         )
-        return cls(datalake_service, timeouts, fs_handler_cls=fs_handler_cls)
 
     def __eq__(self, other):
         if isinstance(other, AccountHandler):
@@ -619,29 +1366,69 @@ class AccountHandler(pyarrow.fs.FileSystemHandler):
         return f'abfs+{self.datalake_service.account_name}'
 
     def normalize_path(self, path):
-        return path.lstrip('/').rstrip('/')
+        return _normalize_path(path)
 
     def _split_path(self, path):
-        path = self.normalize_path(path)
-        if '/' not in path:
-            return path, ''
-        fs_name, *rest = path.split('/')
-        path = '/'.join(rest)
-        if path.endswith('/'):
-            raise ValueError(f'{path} is an illegal path (may not end with /)')
-        return fs_name, path
+        return _split_account_path(path)
 
     def _fs(self, fs_name):
         if fs_name in self.file_system_handlers:
             return self.file_system_handlers[fs_name]
         else:
+            # Only pass on what is set, so that fs_handler_cls written for the original
+            # (file_system_client, prefix_fs, timeouts) signature keep working
+            options = {
+                name: value
+                for name, value in (
+                    ('max_concurrency', self.max_concurrency), ('chunk_size', self.chunk_size)
+                )
+                if value != 'default'
+            }
             new_fs_handler = self.fs_handler_cls(
                 self.datalake_service.get_file_system_client(fs_name),
                 prefix_fs=True,
-                timeouts=self.timeouts
+                timeouts=self.timeouts,
+                **options
             )
+            if self.partition_filter is not None:
+                new_fs_handler.set_partition_filter(self.partition_filter)
             return self.file_system_handlers.setdefault(fs_name, new_fs_handler)
 
+    def set_partition_filter(self, path_filter: typing.Optional[typing.Callable[[str], bool]]):
+        """Only descend into some directories when listing recursively
+
+        See :meth:`FilesystemHandler.set_partition_filter`. Paths passed to the filter
+        start with the name of the file system.
+
+        :param path_filter: callable taking a path and returning a bool, or None
+        """
+        self.partition_filter = path_filter
+        for handler in self.file_system_handlers.values():
+            handler.set_partition_filter(path_filter)
+
+    def _cache_fs_names(self, names):
+        self._fs_name_cache = (time.monotonic() + self.FILE_SYSTEM_CACHE_TTL, set(names))
+
+    def _remember_fs_name(self, fs_name):
+        if self._fs_name_cache is None or self._fs_name_cache[0] < time.monotonic():
+            self._cache_fs_names((fs_name,))
+        else:
+            self._fs_name_cache[1].add(fs_name)
+
+    def _fs_name_known(self, fs_name):
+        cache = self._fs_name_cache
+        return cache is not None and cache[0] >= time.monotonic() and fs_name in cache[1]
+
+    def _file_system_exists(self, fs_name):
+        if self._fs_name_known(fs_name):
+            return True
+        try:
+            self.get_file_system_properties(fs_name)
+        except azure.core.exceptions.ResourceNotFoundError:
+            return False
+        self._remember_fs_name(fs_name)
+        return True
+
     def _get_file_info(self, path):
         fs_name, path = self._split_path(path)
         if not fs_name:
@@ -652,7 +1439,20 @@ class AccountHandler(pyarrow.fs.FileSystemHandler):
         return self._fs(fs_name)._get_file_info(path)
 
     def get_file_info(self, paths):
-        return [self._get_file_info(path) for path in paths]
+        # Hand the paths of each file system over together, so they can share directory listings
+        by_fs = collections.defaultdict(list)
+        for index, path in enumerate(paths):
+            fs_name, path = self._split_path(path)
+            by_fs[fs_name].append((index, path))
+        result = [None] * len(paths)
+        for fs_name, indexed_paths in by_fs.items():
+            if fs_name:
+                infos = self._fs(fs_name).get_file_info([path for _, path in indexed_paths])
+            else:
+                infos = [self._get_file_info('') for _ in indexed_paths]
+            for (index, _), info in zip(indexed_paths, infos):
+                result[index] = info
+        return result
 
     @document_timeout(
         azure.storage.filedatalake.DataLakeServiceClient.list_file_systems,
@@ -669,6 +1469,14 @@ class AccountHandler(pyarrow.fs.FileSystemHandler):
             name, timeout=self.timeouts.datalake_service_timeout
         )
 
+    @document_timeout(
+        azure.storage.filedatalake.FileSystemClient.get_file_system_properties,
+        "datalake_service_timeout")
+    def get_file_system_properties(self, name):
+        return self.datalake_service.get_file_system_client(name).get_file_system_properties(
+            timeout=self.timeouts.datalake_service_timeout
+        )
+
     @document_timeout(
         azure.storage.filedatalake.DataLakeServiceClient.delete_file_system,
         "datalake_service_timeout")
@@ -680,13 +1488,19 @@ class AccountHandler(pyarrow.fs.FileSystemHandler):
     def get_file_info_selector(self, selector: pyarrow.fs.FileSelector):
         fs_name, path = self._split_path(selector.base_dir)
         if not fs_name:
+            file_systems = list(self.list_file_systems())
             file_system_data = [
                 pyarrow.fs.FileInfo(fs.name, pyarrow.fs.FileType.Directory, mtime=fs.last_modified)
-                for fs in self.list_file_systems()
+                for fs in file_systems
             ]
-            if selector.recursive:
-                for fs in self.list_file_systems():
-                    file_system_data.extend(self._fs(fs.name).get_file_info_selector(selector))
+            self._cache_fs_names(info.path for info in file_system_data)
+            if selector.recursive and file_systems:
+                # List the file systems in parallel, so this takes as long as the largest one
+                listings = _fanout(
+                    lambda fs: self._fs(fs.name).get_file_info_selector(selector), file_systems
+                )
+                for listing in listings:
+                    file_system_data.extend(listing)
             return file_system_data
         else:
             sub_selector = pyarrow.fs.FileSelector(
@@ -697,12 +1511,14 @@ class AccountHandler(pyarrow.fs.FileSystemHandler):
     def create_dir(self, path, recursive):
         fs_name, path = self._split_path(path)
 
-        # This `create_dir` requires us to create a container if it does not exist
-        if recursive or not path:
+        # This `create_dir` requires us to create a container if it does not exist.
+        # Skip the attempt for containers known to exist, it would only fail with a conflict.
+        if (recursive or not path) and not self._fs_name_known(fs_name):
             try:
                 self.create_file_system(fs_name)
+                self._remember_fs_name(fs_name)
             except azure.core.exceptions.ResourceExistsError:
-                pass
+                self._remember_fs_name(fs_name)
             except azure.core.exceptions.HttpResponseError as e:
                 if 'AuthorizationFailure' in e.message:
                     # We don't have permission to create the file system, but it might still exist.
@@ -720,6 +1536,9 @@ class AccountHandler(pyarrow.fs.FileSystemHandler):
         fs_name, path = self._split_path(path)
         if not path:
             self.delete_file_system(fs_name)
+            if self._fs_name_cache is not None:
+                self._fs_name_cache[1].discard(fs_name)
+            self._fs(fs_name).invalidate()
         else:
             self._fs(fs_name).delete_dir(path)
 
@@ -729,6 +1548,9 @@ class AccountHandler(pyarrow.fs.FileSystemHandler):
             if accept_root_dir:
                 for fs in self.list_file_systems():
                     self.delete_file_system(fs.name)
+                self._cache_fs_names(())
+                for handler in self.file_system_handlers.values():
+                    handler.invalidate()
             else:
                 raise ValueError('Attempt to remove root dir with accept_root_dir=False')
         else:
@@ -745,7 +1567,7 @@ class AccountHandler(pyarrow.fs.FileSystemHandler):
         elif not path:
             raise IsADirectoryError(fs_name)
         else:
-            if fs_name not in [fs.name for fs in self.list_file_systems()]:
+            if not self._file_system_exists(fs_name):
                 raise FileNotFoundError(fs_name)
             self._fs(fs_name).delete_file(path)
 
@@ -773,10 +1595,14 @@ class AccountHandler(pyarrow.fs.FileSystemHandler):
         except FileNotFoundError:
             pass
 
-        if fi.is_file:
-            self._fs(src_fs).rename_file(src_path, dest)
-        else:
-            self._fs(src_fs).rename_directory(src_path, dest)
+        try:
+            if fi.is_file:
+                self._fs(src_fs).rename_file(src_path, dest)
+            else:
+                self._fs(src_fs).rename_directory(src_path, dest)
+        finally:
+            self._fs(src_fs).invalidate(src_path)
+            self._fs(dst_fs).invalidate(dst_path)
 
     def copy_file(self, src, dest):
         try:
@@ -786,9 +1612,22 @@ class AccountHandler(pyarrow.fs.FileSystemHandler):
         except FileNotFoundError:
             pass
 
+        src_fs, src_path = self._split_path(src)
+        dst_fs, dst_path = self._split_path(dest)
+        self._require_path(src_path)
+        self._require_path(dst_path)
+        source, target = self._fs(src_fs), self._fs(dst_fs)
+        # The service can also copy between file systems in the account
+        source._verify_is_file(src_path)
+        if _server_side_copy(
+                source._file_client(src_path), target._file_client(dst_path),
+                self.timeouts.file_client_timeout, target.COPY_TIMEOUT):
+            target.invalidate(dst_path)
+            return
+
         with self.open_input_stream(src) as read_from:
             with self.open_output_stream(dest) as write_to:
-                write_to.write(read_from.read())
+                _copy_stream(read_from, write_to)
 
     def _require_path(self, path):
         if not path:
@@ -1,7 +1,16 @@
+import array
+import concurrent.futures
 import datetime
+import functools
 import os
+import pickle
+import threading
+import time
+import uuid
 
+import azure.core.exceptions
 import azure.identity
+import azure.storage.blob
 import azure.storage.filedatalake
 import pandas as pd
 import numpy as np
@@ -14,48 +23,180 @@ import pytest
 from .. import core
 
 
-@pytest.fixture(scope='module')
+# Set by pytest-xdist in each of its workers, f. ex. gw0
+XDIST_WORKER = os.environ.get('PYTEST_XDIST_WORKER', '')
+# Tests that expect to have the account to themselves can't run next to other workers
+whole_account = pytest.mark.skipif(
+    bool(XDIST_WORKER), reason='inspects the whole account, which other workers also write to'
+)
+
+
+class CachedTokenCredential:
+    """Hand out the same token for the same scopes until it is about to expire"""
+
+    def __init__(self, credential):
+        self.credential = credential
+        self._tokens = {}
+        self._lock = threading.Lock()
+
+    def get_token(self, *scopes, **kwargs):
+        if kwargs:
+            # Claims challenges and the like need a fresh token
+            return self.credential.get_token(*scopes, **kwargs)
+        with self._lock:
+            token = self._tokens.get(scopes)
+            if token is None or token.expires_on - 300 < time.time():
+                token = self._tokens[scopes] = self.credential.get_token(*scopes)
+            return token
+
+
+# Handlers define __eq__ without __hash__, so file systems are cached by id, keeping the
+# handler alive alongside so that the id is not reused
+_fs_cache = {}
+
+
+def fs_for(handler):
+    if id(handler) not in _fs_cache:
+        _fs_cache[id(handler)] = (handler, handler.to_fs())
+    return _fs_cache[id(handler)][1]
+
+
+@functools.lru_cache(maxsize=None)
+def file_system_client(datalake_service, name):
+    return datalake_service.get_file_system_client(name)
+
+
+def write_small(account_handler, path, data):
+    """Create a file with a single request, for tests that only need it to exist"""
+    fs_name, path = account_handler._split_path(path)
+    fc = account_handler.datalake_service.get_file_client(fs_name, path)
+    fc.upload_data(data, overwrite=True, length=len(data))
+    account_handler._fs(fs_name).invalidate(path)
+
+
+def read_small(account_handler, path):
+    """Read a whole file with a single request, for tests that only check its content"""
+    fs_name, path = account_handler._split_path(path)
+    fc = account_handler.datalake_service.get_file_client(fs_name, path)
+    return fc.download_file().readall()
+
+
+def record_downloads(monkeypatch):
+    """Collect the (offset, length) of every download made through DatalakeGen2File"""
+    downloads = []
+    download_file = core.DatalakeGen2File.download_file
+
+    def recording(self, loc, length):
+        downloads.append((loc, length))
+        return download_file(self, loc, length)
+
+    monkeypatch.setattr(core.DatalakeGen2File, 'download_file', recording)
+    return downloads
+
+
+PARTITION_SCHEMA = pyarrow.schema([('i', pyarrow.int64()), ('dir', pyarrow.string())])
+
+
+def parquet_bytes(df, schema=PARTITION_SCHEMA):
+    """Encode a small frame to parquet in memory, without inferring its schema"""
+    table = pyarrow.Table.from_pandas(df, schema=schema, preserve_index=False)
+    out = pyarrow.BufferOutputStream()
+    pyarrow.parquet.write_table(table, out, compression='none')
+    return out.getvalue().to_pybytes()
+
+
+def paths(listing):
+    return frozenset(info.path for info in listing)
+
+
+def run_concurrently(*calls):
+    """Run independent setup calls at the same time, and raise the first error"""
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(calls)) as executor:
+        for future in [executor.submit(call) for call in calls]:
+            future.result()
+
+
+@pytest.fixture(scope='session')
 def credential():
     return azure.identity.DefaultAzureCredential()
 
 
-@pytest.fixture(scope='module')
+@pytest.fixture(scope='session')
+def cached_credential(credential):
+    return CachedTokenCredential(credential)
+
+
+@pytest.fixture(scope='session')
 def account_name():
     # NB NB: ALL CONTENT IS DELETED AS PART OF TEST RUNNING
     # USE A DEDICATED TESTING ACCOUNT
     return os.environ['AZUREARROWFS_TEST_ACT']
 
 
-@pytest.fixture(scope='module')
-def datalake_service_account(account_name, credential):
+@pytest.fixture(scope='session')
+def datalake_service_account(account_name, cached_credential):
     return azure.storage.filedatalake.DataLakeServiceClient(
         f'https://{account_name}.dfs.core.windows.net',
-        credential
+        cached_credential,
+        transport=core._pooled_transport()
     )
 
 
-@pytest.fixture(scope='module')
+@pytest.fixture(scope='session')
 def _account_handler(datalake_service_account):
     return core.AccountHandler(datalake_service_account)
 
 
-@pytest.fixture(scope='module')
-def account_handler(_account_handler):
-    yield _account_handler
-    for fs in _account_handler.datalake_service.list_file_systems():
-        _account_handler.datalake_service.delete_file_system(fs)
+@pytest.fixture(scope='session')
+def ns():
+    # Prefix for the file systems tests create, so that a run does not trip over
+    # file systems left behind by an interrupted earlier run, or by other pytest-xdist workers
+    return f'{XDIST_WORKER}{uuid.uuid4().hex[:8]}'
 
 
-@pytest.fixture(scope='module')
-def fs_handler(datalake_service_account):
-    if 'testfs' not in [fs.name for fs in datalake_service_account.list_file_systems()]:
-        datalake_service_account.create_file_system('testfs')
-    return core.FilesystemHandler(datalake_service_account.get_file_system_client('testfs'))
+@pytest.fixture(scope='session')
+def account_handler(_account_handler, ns):
+    yield _account_handler
+    service = _account_handler.datalake_service
+    file_systems = [
+        fs.name for fs in service.list_file_systems()
+        # Other workers may still be using theirs
+        if not XDIST_WORKER or fs.name.startswith(ns)
+    ]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=16) as executor:
+        list(executor.map(service.delete_file_system, file_systems))
+
+
+@pytest.fixture(scope='session')
+def fs_handler(datalake_service_account, ns):
+    try:
+        datalake_service_account.create_file_system(f'{ns}testfs')
+    except azure.core.exceptions.ResourceExistsError:
+        pass
+    return core.FilesystemHandler(file_system_client(datalake_service_account, f'{ns}testfs'))
+
+
+@pytest.fixture(scope='session')
+def big_parquet():
+    # approx. 40 mb, generated and encoded once per session
+    df = pd.DataFrame(np.random.default_rng(0).standard_normal((1000000, 5)))
+    sink = pyarrow.BufferOutputStream()
+    # Random floats don't compress, and the test is about moving the bytes, not encoding them
+    pyarrow.parquet.write_table(
+        pyarrow.Table.from_pandas(df=df), sink,
+        compression='none', use_dictionary=False, row_group_size=1000000
+    )
+    return df, sink.getvalue()
 
 
 @pytest.fixture(scope='module')
-def limited_access_sas_token(datalake_service_account: azure.storage.filedatalake.DataLakeServiceClient, credential):
-    file_sys = datalake_service_account.create_file_system('sastokenfs')
+def limited_access_sas_token(
+        datalake_service_account: azure.storage.filedatalake.DataLakeServiceClient, ns):
+    try:
+        file_sys = datalake_service_account.create_file_system(f'{ns}sastokenfs')
+    except azure.core.exceptions.ResourceExistsError:
+        # Left over from an interrupted run
+        file_sys = file_system_client(datalake_service_account, f'{ns}sastokenfs')
     now = datetime.datetime.now()
     valid_from = now - datetime.timedelta(hours=2)
     valid_to = now + datetime.timedelta(minutes=10)
@@ -76,13 +217,36 @@ def limited_access_account_handler(limited_access_sas_token, account_name):
     return core.AccountHandler.from_account_name(account_name, credential=limited_access_sas_token)
 
 
-def test_fs_handler_from_account_name_does_not_prefix(account_name, credential):
+def test_fs_handler_from_account_name_does_not_prefix(account_name, cached_credential):
     handler = core.FilesystemHandler.from_account_name(
-        account_name, 'testfs', credential
+        account_name, 'testfs', cached_credential
     )
     assert not handler.prefix_fs
 
 
+def test_handlers_pickle():
+    # Sent to other processes by f. ex. dask or multiprocessing, nothing here makes a request
+    fs_handler = core.FilesystemHandler.from_account_name('pickledaccount', 'testfs')
+    account_handler = core.AccountHandler.from_account_name('pickledaccount')
+    # Runtime state that can not be pickled, and must be created again after unpickling
+    fs_handler._transfer_pool()
+    account_handler._fs('testfs')._transfer_pool()
+    for handler in (fs_handler, account_handler):
+        fs = handler.to_fs()
+        unpickled = pickle.loads(pickle.dumps(fs))
+        assert unpickled.type_name == fs.type_name
+    unpickled = pickle.loads(pickle.dumps(account_handler))._fs('testfs')
+    assert unpickled._file_client('path').path_name == 'path'
+    assert unpickled._transfer_pool() is not account_handler._fs('testfs')._transfer_pool()
+    unpickled.invalidate('path')
+
+
+def test_parse_azure_ts():
+    expected = datetime.datetime(2020, 8, 17, 12, 19, 35, tzinfo=datetime.timezone.utc)
+    assert core._parse_azure_ts('Mon, 17 Aug 2020 12:19:35 GMT') == expected
+    assert core._parse_azure_ts(expected) is expected
+
+
 class TestFilesystemHandler:
 
     def test_list_unknown_directory(self, fs_handler):
@@ -94,10 +258,21 @@ class TestFilesystemHandler:
         with pytest.raises(FileNotFoundError):
             fs_handler.get_file_info(['no-such-file'])
 
+    def test_copy_file(self, fs_handler, monkeypatch):
+        with fs_handler.open_output_stream('copy/src') as out:
+            out.write(b'content')
+        downloads = record_downloads(monkeypatch)
+        fs_handler.copy_file('copy/src', 'copy/dst')
+        # Copied by the service, without passing through this process
+        assert downloads == []
+        with fs_handler.open_input_stream('copy/dst') as inp:
+            assert inp.read() == b'content'
+
 
 class TestAccountHandler:
 
-    def test_ls_empty_account(self, account_handler):
+    @whole_account
+    def test_ls_empty_account(self, account_handler, ns):
         # Getting a fileinfo for the root ("") always succeeds,
         # but using a selector on it yields an empty list
         # This makes sense if you think of the selector as finding the content of the root,
@@ -106,191 +281,346 @@ class TestAccountHandler:
         assert listing.path == ''
         assert listing.type == pyarrow.fs.FileType.Directory
         listing = account_handler.get_file_info_selector(pyarrow.fs.FileSelector('', recursive=False))
-        paths = [fi.path for fi in listing if fi.path != 'testfs']
-        assert paths == []
+        assert paths(listing) - {f'{ns}testfs'} == set()
 
-    def test_create_dir_simple(self, account_handler: core.AccountHandler):
-        account_handler.create_dir('testfs', False)
-        listing = account_handler.get_file_info(['testfs'])[0]
-        assert listing.path == 'testfs'
+    @whole_account
+    def test_create_dir_simple(self, account_handler: core.AccountHandler, ns):
+        account_handler.create_dir(f'{ns}testfs', False)
+        listing = account_handler.get_file_info([f'{ns}testfs'])[0]
+        assert listing.path == f'{ns}testfs'
         assert listing.type == pyarrow.fs.FileType.Directory
         listing = account_handler.get_file_info_selector(pyarrow.fs.FileSelector('', recursive=False))[0]
-        assert listing.path == 'testfs'
+        assert listing.path == f'{ns}testfs'
         assert listing.type == pyarrow.fs.FileType.Directory
 
-    def test_create_dir_nested(self, account_handler):
-        account_handler.create_dir('testfs/folder/content', True)
+    @whole_account
+    def test_create_dir_nested(self, account_handler, ns):
+        account_handler.create_dir(f'{ns}testfs/folder/content', True)
         selector = pyarrow.fs.FileSelector('', recursive=True)
         infos = account_handler.get_file_info_selector(selector)
-        paths = {info.path for info in infos}
-        assert paths == {'testfs', 'testfs/folder', 'testfs/folder/content'}
+        assert paths(infos) == {f'{ns}testfs', f'{ns}testfs/folder', f'{ns}testfs/folder/content'}
         assert {pyarrow.fs.FileType.Directory} == {info.type for info in infos}
 
     def test_writing_file_on_root_fails(self, account_handler):
         with pytest.raises(ValueError):
             account_handler.open_output_stream('root_file')
 
-    def test_delete_dir_fs_account(self, account_handler):
-        account_handler.create_dir('testdeletefs', False)
+    def test_delete_dir_fs_account(self, account_handler, ns):
+        account_handler.create_dir(f'{ns}testdeletefs', False)
         selector = pyarrow.fs.FileSelector('', recursive=False)
         listing = account_handler.get_file_info_selector(selector)
-        assert 'testdeletefs' in [info.path for info in listing]
-        account_handler.delete_dir('testdeletefs')
+        assert f'{ns}testdeletefs' in paths(listing)
+        account_handler.delete_dir(f'{ns}testdeletefs')
         listing = account_handler.get_file_info_selector(selector)
-        assert 'testdeletefs' not in [info.path for info in listing]
+        assert f'{ns}testdeletefs' not in paths(listing)
 
     def test_create_dir_nonrecursive_no_fs(self, account_handler):
         with pytest.raises(FileNotFoundError):
             account_handler.create_dir('dont/work', False)
 
-    def test_delete_dir(self, account_handler):
-        account_handler.create_dir('testdeletefs2/folder', True)
-        selector = pyarrow.fs.FileSelector('testdeletefs2', recursive=False)
+    def test_delete_dir(self, account_handler, ns):
+        account_handler.create_dir(f'{ns}testdeletefs2/folder', True)
+        selector = pyarrow.fs.FileSelector(f'{ns}testdeletefs2', recursive=False)
         listing = account_handler.get_file_info_selector(selector)
-        assert 'testdeletefs2/folder' in [info.path for info in listing]
-        account_handler.delete_dir('testdeletefs2/folder')
+        assert f'{ns}testdeletefs2/folder' in paths(listing)
+        account_handler.delete_dir(f'{ns}testdeletefs2/folder')
         listing = account_handler.get_file_info_selector(selector)
-        assert 'folder' not in [info.path for info in listing]
+        assert 'folder' not in paths(listing)
 
-    def test_file_io(self, account_handler):
-        account_handler.create_dir('writefile/folder', True)
-        with account_handler.open_output_stream('writefile/folder/file') as out:
+    def test_file_io(self, account_handler, ns):
+        account_handler.create_dir(f'{ns}writefile/folder', True)
+        with account_handler.open_output_stream(f'{ns}writefile/folder/file') as out:
             out.write(b'content')
-        with account_handler.open_input_stream('writefile/folder/file') as inp:
+        with account_handler.open_input_stream(f'{ns}writefile/folder/file') as inp:
             assert inp.read() == b'content'
-        file_info = account_handler.get_file_info(['writefile/folder/file'])[0]
-        assert file_info.path == 'writefile/folder/file'
+        file_info = account_handler.get_file_info([f'{ns}writefile/folder/file'])[0]
+        assert file_info.path == f'{ns}writefile/folder/file'
         assert file_info.size == 7
         assert file_info.type == pyarrow.fs.FileType.File
         assert file_info.mtime
 
-    def test_delete_dir_contents(self, account_handler):
-        account_handler.create_dir('deletecontents/folder', True)
-        with account_handler.open_output_stream('deletecontents/file') as out:
-            out.write(b'content')
-        selector = pyarrow.fs.FileSelector('deletecontents', recursive=True)
+    def test_read_ranges(self, account_handler, ns):
+        account_handler.create_dir(f'{ns}readranges', recursive=False)
+        data = bytes(range(256)) * 16
+        with account_handler.open_output_stream(f'{ns}readranges/data') as out:
+            out.write(data)
+        fc = account_handler.datalake_service.get_file_client(f'{ns}readranges', 'data')
+        with core.DatalakeGen2File(fc) as f:
+            ranges = [(10, 5), (0, 3), (3000, 100), (4090, 100)]
+            assert f.read_ranges(ranges) == [data[10:15], data[0:3], data[3000:3100], data[4090:]]
+            assert f.tell() == 0
+
+    def test_flush_commits_only_on_explicit_flush(self, account_handler, ns):
+        account_handler.create_dir(f'{ns}explicitflush', recursive=False)
+        fc = account_handler.datalake_service.get_file_client(f'{ns}explicitflush', 'data')
+        with core.DatalakeGen2File(fc, mode='wb') as f:
+            f.write(b'first')
+            # flush uploads the data, but does not make it part of the file
+            f.flush()
+            assert read_small(account_handler, f'{ns}explicitflush/data') == b''
+            f.explicit_flush()
+            assert read_small(account_handler, f'{ns}explicitflush/data') == b'first'
+            f.write(b'second')
+            f.flush()
+            assert read_small(account_handler, f'{ns}explicitflush/data') == b'first'
+        assert read_small(account_handler, f'{ns}explicitflush/data') == b'firstsecond'
+
+    def test_write_counts_bytes(self, account_handler, ns):
+        account_handler.create_dir(f'{ns}writebytes', recursive=False)
+        fc = account_handler.datalake_service.get_file_client(f'{ns}writebytes', 'data')
+        ints = array.array('i', [1, 2, 3])
+        with core.DatalakeGen2File(fc, mode='wb') as f:
+            assert f.write(memoryview(ints)) == 3 * ints.itemsize
+            assert f.tell() == 3 * ints.itemsize
+        assert read_small(account_handler, f'{ns}writebytes/data') == ints.tobytes()
+
+    def test_random_access_readahead(self, account_handler, ns, monkeypatch):
+        account_handler.create_dir(f'{ns}readahead', recursive=False)
+        data = bytes(range(256)) * 64
+        write_small(account_handler, f'{ns}readahead/data', data)
+        fc = account_handler.datalake_service.get_file_client(f'{ns}readahead', 'data')
+        downloads = record_downloads(monkeypatch)
+        with core.DatalakeGen2RandomAccessFile(fc, tail_size=0, range_size=4096) as f:
+            assert downloads == []
+            # A small read fetches a whole range, and the reads around it are served from memory
+            assert f.read_at(10, 100) == data[100:110]
+            assert f.read_at(100, 200) == data[200:300]
+            assert downloads == [(100, 4096)]
+            assert f.read_at(10, 8000) == data[8000:8010]
+            assert downloads[1:] == [(8000, 4096)]
+            # Large reads are fetched as they are, and ranges stop at the end of the file
+            assert f.read_at(5000, 0) == data[:5000]
+            assert downloads[2:] == [(0, 5000)]
+            assert f.read_at(100, len(data) - 50) == data[-50:]
+            assert downloads[3:] == [(len(data) - 50, 50)]
+            assert f.read_at(10, len(data)) == b''
+            assert len(downloads) == 4
+
+    def test_random_access_tail_prefetch(self, account_handler, ns, monkeypatch):
+        account_handler.create_dir(f'{ns}tailprefetch', recursive=False)
+        data = bytes(range(256)) * 64
+        write_small(account_handler, f'{ns}tailprefetch/data', data)
+        fc = account_handler.datalake_service.get_file_client(f'{ns}tailprefetch', 'data')
+        downloads = record_downloads(monkeypatch)
+        with core.DatalakeGen2RandomAccessFile(fc, tail_size=1024) as f:
+            assert downloads == [(len(data) - 1024, 1024)]
+            assert f.read_at(8, len(data) - 8) == data[-8:]
+            f.seek(-100, 2)
+            assert f.read() == data[-100:]
+            assert len(downloads) == 1
+
+        # Parquet files get a tail large enough for their footer, here the whole file
+        table = pyarrow.table({'i': list(range(1000))})
+        parquet = pyarrow.BufferOutputStream()
+        pyarrow.parquet.write_table(table, parquet)
+        parquet = parquet.getvalue().to_pybytes()
+        write_small(account_handler, f'{ns}tailprefetch/data.parquet', parquet)
+        monkeypatch.setattr(core.FilesystemHandler, 'SMALL_FILE_SIZE', 0)
+        del downloads[:]
+        with account_handler.open_input_file(f'{ns}tailprefetch/data.parquet') as f:
+            assert pyarrow.parquet.read_table(f).equals(table)
+        assert downloads == [(0, len(parquet))]
+
+    def test_delete_dir_contents(self, account_handler, ns):
+        account_handler.create_dir(f'{ns}deletecontents/folder', True)
+        write_small(account_handler, f'{ns}deletecontents/file', b'content')
+        selector = pyarrow.fs.FileSelector(f'{ns}deletecontents', recursive=True)
         assert len(account_handler.get_file_info_selector(selector)) == 2
-        account_handler.delete_dir_contents('deletecontents')
+        account_handler.delete_dir_contents(f'{ns}deletecontents')
         assert len(account_handler.get_file_info_selector(selector)) == 0
 
-    def test_delete_file(self, account_handler):
-        account_handler.create_dir('deletefile', True)
+    def test_delete_file(self, account_handler, ns):
+        account_handler.create_dir(f'{ns}deletefile', True)
         with pytest.raises(FileNotFoundError):
             account_handler.delete_file('')
         with pytest.raises(IsADirectoryError):
-            account_handler.delete_file('deletefile')
+            account_handler.delete_file(f'{ns}deletefile')
         with pytest.raises(FileNotFoundError):
             account_handler.delete_file('nosuchcontainer/file')
-        account_handler.create_dir('deletefile', True)
+        account_handler.create_dir(f'{ns}deletefile', True)
         with pytest.raises(FileNotFoundError):
-            account_handler.delete_file('deletefile/file')
-        with account_handler.open_output_stream('deletefile/file') as out:
-            out.write(b'content')
-        selector = pyarrow.fs.FileSelector('deletefile', recursive=True)
+            account_handler.delete_file(f'{ns}deletefile/file')
+        write_small(account_handler, f'{ns}deletefile/file', b'content')
+        selector = pyarrow.fs.FileSelector(f'{ns}deletefile', recursive=True)
         assert len(account_handler.get_file_info_selector(selector)) == 1
-        account_handler.delete_file('deletefile/file')
+        account_handler.delete_file(f'{ns}deletefile/file')
         assert account_handler.get_file_info_selector(selector) == []
 
-    def test_move(self, account_handler):
-        account_handler.create_dir('movesrc', False)
+    def test_move(self, account_handler, ns):
+        account_handler.create_dir(f'{ns}movesrc', False)
         with pytest.raises(ValueError):
             # We don't support moving file systems
-            account_handler.move('movesrc', 'movedst')
-        account_handler.create_dir('movesrc/folder', True)
-        account_handler.create_dir('movedst/move_dir', recursive=True)
+            account_handler.move(f'{ns}movesrc', f'{ns}movedst')
+        run_concurrently(
+            lambda: account_handler.create_dir(f'{ns}movesrc/folder', True),
+            lambda: account_handler.create_dir(f'{ns}movedst/move_dir', recursive=True)
+        )
         with pytest.raises(ValueError):
             # Target must not not be file system
-            account_handler.move('movesrc/folder', 'move_dst')
+            account_handler.move(f'{ns}movesrc/folder', 'move_dst')
 
-        with account_handler.open_output_stream('movesrc/move_file') as out:
-            out.write(b'content1')
-        with account_handler.open_output_stream('movedst/move_dir/dst_file') as out:
-            out.write(b'content2')
+        run_concurrently(
+            lambda: write_small(account_handler, f'{ns}movesrc/move_file', b'content1'),
+            lambda: write_small(account_handler, f'{ns}movedst/move_dir/dst_file', b'content2')
+        )
 
         with pytest.raises(ValueError):
             # Can't rename file to folder
-            account_handler.move('movesrc/move_file', 'movedst/move_dir')
+            account_handler.move(f'{ns}movesrc/move_file', f'{ns}movedst/move_dir')
         with pytest.raises(ValueError):
             # Can't move to non-empty dir
-            account_handler.move('movesrc/folder', 'movedst/move_dir')
-        account_handler.move('movedst/move_dir/dst_file', 'movedst/dst_file')
-        account_handler.move('movesrc/folder', 'movedst/move_dir')
-        account_handler.move('movesrc/move_file', 'movedst/dst_file')
-        with account_handler.open_input_stream('movedst/dst_file') as inp:
+            account_handler.move(f'{ns}movesrc/folder', f'{ns}movedst/move_dir')
+        account_handler.move(f'{ns}movedst/move_dir/dst_file', f'{ns}movedst/dst_file')
+        account_handler.move(f'{ns}movesrc/folder', f'{ns}movedst/move_dir')
+        account_handler.move(f'{ns}movesrc/move_file', f'{ns}movedst/dst_file')
+        assert read_small(account_handler, f'{ns}movedst/dst_file') == b'content1'
+        with account_handler.open_input_stream(f'{ns}movedst/dst_file') as inp:
             assert inp.read() == b'content1'
 
-    def test_roundtrip_big_file(self, account_handler):
-        account_handler.create_dir('bigfile', recursive=False)
-        # approx. 40 mb
-        df = pd.DataFrame(np.random.normal(size=(1000000, 5)))
-        table = pyarrow.Table.from_pandas(df=df)
-        with account_handler.open_output_stream('bigfile/bigfile.parq') as bigfile:
-            pyarrow.parquet.write_table(table, bigfile)
-        del table
-        ds = pyarrow.dataset.dataset('bigfile/bigfile.parq', filesystem=account_handler.to_fs())
+    def test_copy_file(self, account_handler, ns, monkeypatch):
+        run_concurrently(
+            lambda: account_handler.create_dir(f'{ns}copysrc', recursive=False),
+            lambda: account_handler.create_dir(f'{ns}copydst', recursive=False)
+        )
+        write_small(account_handler, f'{ns}copysrc/file', b'content')
+        downloads = record_downloads(monkeypatch)
+        account_handler.copy_file(f'{ns}copysrc/file', f'{ns}copysrc/copy')
+        account_handler.copy_file(f'{ns}copysrc/file', f'{ns}copydst/copy')
+        assert downloads == []
+        assert read_small(account_handler, f'{ns}copysrc/copy') == b'content'
+        assert read_small(account_handler, f'{ns}copydst/copy') == b'content'
+        with pytest.raises(IsADirectoryError):
+            account_handler.copy_file(f'{ns}copysrc/file', f'{ns}copydst')
+
+    def test_copy_file_falls_back_to_streaming(self, account_handler, ns, monkeypatch):
+        def refuse_copy(self, *args, **kwargs):
+            error = azure.core.exceptions.HttpResponseError('copy refused')
+            error.status_code = 403
+            raise error
+
+        monkeypatch.setattr(azure.storage.blob.BlobClient, 'start_copy_from_url', refuse_copy)
+        account_handler.create_dir(f'{ns}copyfallback', recursive=False)
+        write_small(account_handler, f'{ns}copyfallback/file', b'content')
+        downloads = record_downloads(monkeypatch)
+        account_handler.copy_file(f'{ns}copyfallback/file', f'{ns}copyfallback/copy')
+        assert downloads
+        assert read_small(account_handler, f'{ns}copyfallback/copy') == b'content'
+
+    def test_listing_cache_sees_own_changes(self, account_handler, ns):
+        account_handler.create_dir(f'{ns}listingcache/dir', recursive=True)
+        # Long enough that nothing in the test is seen because the listing expired
+        account_handler._fs(f'{ns}listingcache').listing_ttl = 3600
+        selector = pyarrow.fs.FileSelector(f'{ns}listingcache/dir', recursive=False)
+
+        def listed():
+            return paths(account_handler.get_file_info_selector(selector))
+
+        assert listed() == set()
+        fc = account_handler.datalake_service.get_file_client(f'{ns}listingcache', 'dir/other')
+        fc.upload_data(b'other', overwrite=True)
+        # Changes made by other means are seen once the listing is invalidated
+        assert listed() == set()
+        account_handler._fs(f'{ns}listingcache').invalidate('dir/other')
+        assert listed() == {f'{ns}listingcache/dir/other'}
+        with account_handler.open_output_stream(f'{ns}listingcache/dir/a') as out:
+            out.write(b'a')
+        assert listed() == {f'{ns}listingcache/dir/other', f'{ns}listingcache/dir/a'}
+        account_handler.move(f'{ns}listingcache/dir/a', f'{ns}listingcache/dir/b')
+        assert listed() == {f'{ns}listingcache/dir/other', f'{ns}listingcache/dir/b'}
+        account_handler.copy_file(f'{ns}listingcache/dir/b', f'{ns}listingcache/dir/c')
+        assert listed() == {
+            f'{ns}listingcache/dir/other', f'{ns}listingcache/dir/b', f'{ns}listingcache/dir/c'
+        }
+        account_handler.delete_file(f'{ns}listingcache/dir/b')
+        assert listed() == {f'{ns}listingcache/dir/other', f'{ns}listingcache/dir/c'}
+        account_handler.delete_dir_contents(f'{ns}listingcache/dir')
+        assert listed() == set()
+
+    def test_roundtrip_big_file(self, account_handler, big_parquet, ns):
+        df, parquet = big_parquet
+        account_handler.create_dir(f'{ns}bigfile', recursive=False)
+        with account_handler.open_output_stream(f'{ns}bigfile/bigfile.parq') as bigfile:
+            bigfile.write(parquet)
+        ds = pyarrow.dataset.dataset(
+            f'{ns}bigfile/bigfile.parq', filesystem=fs_for(account_handler)
+        )
         df2 = ds.to_table().to_pandas(self_destruct=True)
-        assert (df == df2).all().all()
+        assert np.array_equal(df.to_numpy(copy=False), df2.to_numpy(copy=False))
 
-    def test_leading_trailing_slash(self, account_handler):
-        account_handler.create_dir('leadingslash/subfolder/ds', recursive=True)
-        df = pd.DataFrame(np.random.normal(size=(10, 5)))
+    def test_leading_trailing_slash(self, account_handler, ns):
+        account_handler.create_dir(f'{ns}leadingslash/subfolder/ds', recursive=True)
+        df = pd.DataFrame(np.random.default_rng(0).standard_normal((10, 5)))
         table = pyarrow.Table.from_pandas(df=df)
-        with account_handler.open_output_stream('leadingslash/subfolder/ds/part.parq') as out:
+        with account_handler.open_output_stream(f'{ns}leadingslash/subfolder/ds/part.parq') as out:
             pyarrow.parquet.write_table(table, out)
 
         pd.read_parquet(
-            '/leadingslash/subfolder/ds/part.parq/',
-            filesystem=account_handler.to_fs()
+            f'/{ns}leadingslash/subfolder/ds/part.parq/',
+            filesystem=fs_for(account_handler)
         )
 
-    def test_partitioned_parquet(self, account_handler):
-        account_handler.create_dir('partitioned/ds', recursive=True)
-        fs = account_handler.to_fs()
+    def test_partitioned_parquet(self, account_handler, ns):
+        account_handler.create_dir(f'{ns}partitioned/ds', recursive=True)
+        fs = fs_for(account_handler)
 
-        table_left = pyarrow.Table.from_pandas(
-            pd.DataFrame({'i': list(range(10))}).assign(dir='left')
-        )
-        table_right = pyarrow.Table.from_pandas(
-            pd.DataFrame({'i': list(range(10, 20))}).assign(dir='right')
+        left = parquet_bytes(pd.DataFrame({'i': list(range(10))}).assign(dir='left'))
+        right = parquet_bytes(pd.DataFrame({'i': list(range(10, 20))}).assign(dir='right'))
+        run_concurrently(
+            lambda: write_small(account_handler, f'{ns}partitioned/ds/dir=left', left),
+            lambda: write_small(account_handler, f'{ns}partitioned/ds/dir=right', right)
         )
 
-        with account_handler.open_output_stream('partitioned/ds/dir=left') as out:
-            pyarrow.parquet.write_table(table_left, out)
-        with account_handler.open_output_stream('partitioned/ds/dir=right') as out:
-            pyarrow.parquet.write_table(table_right, out)
-
-        ds = pyarrow.dataset.dataset('partitioned/ds', filesystem=fs, partitioning='hive')
+        ds = pyarrow.dataset.dataset(f'{ns}partitioned/ds', filesystem=fs, partitioning='hive')
         table_left = ds.to_table(filter=pyarrow.dataset.field('dir') == 'left').to_pandas()
         table_right = ds.to_table(filter=pyarrow.dataset.field('dir') == 'right').to_pandas()
 
         assert table_left.i.max() == 9
         assert table_right.i.max() == 19
 
-    def test_open_output_stream_with_arrow_fs(self, account_handler):
-        account_handler.create_dir('patest', recursive=False)
-        with account_handler.to_fs().open_output_stream('patest/t.pq') as o:
+    def test_partition_filter(self, account_handler, ns):
+        run_concurrently(
+            lambda: account_handler.create_dir(f'{ns}partfilter/ds/year=2020', recursive=True),
+            lambda: account_handler.create_dir(f'{ns}partfilter/ds/year=2021', recursive=True)
+        )
+        run_concurrently(
+            lambda: write_small(account_handler, f'{ns}partfilter/ds/year=2020/part', b'2020'),
+            lambda: write_small(account_handler, f'{ns}partfilter/ds/year=2021/part', b'2021')
+        )
+        account_handler.set_partition_filter(lambda path: not path.endswith('year=2021'))
+        try:
+            selector = pyarrow.fs.FileSelector(f'{ns}partfilter/ds', recursive=True)
+            listing = account_handler.get_file_info_selector(selector)
+        finally:
+            account_handler.set_partition_filter(None)
+        assert paths(listing) == {
+            f'{ns}partfilter/ds/year=2020', f'{ns}partfilter/ds/year=2020/part'
+        }
+
+    def test_open_output_stream_with_arrow_fs(self, account_handler, ns):
+        account_handler.create_dir(f'{ns}patest', recursive=False)
+        with fs_for(account_handler).open_output_stream(f'{ns}patest/t.pq') as o:
             o.write(b'anything')
 
-    def test_open_with_metadata(self, account_handler):
-        account_handler.create_dir('patest', recursive=False)
+    def test_open_with_metadata(self, account_handler, ns):
+        account_handler.create_dir(f'{ns}patest', recursive=False)
         md = {'content_type': 'application/octet-stream'}
-        with account_handler.to_fs().open_output_stream('patest/t.pq', metadata=md) as o:
+        with fs_for(account_handler).open_output_stream(f'{ns}patest/t.pq', metadata=md) as o:
             o.write(b'anything')
 
-    def test_read_full_file_twice(self, account_handler):
-        account_handler.create_dir('fstest', recursive=False)
-        with account_handler.open_output_stream('fstest/data.txt') as o:
+    def test_read_full_file_twice(self, account_handler, ns):
+        account_handler.create_dir(f'{ns}fstest', recursive=False)
+        with account_handler.open_output_stream(f'{ns}fstest/data.txt') as o:
             o.write(b"testdata")
-        with account_handler.to_fs().open_input_stream('fstest/data.txt') as fp:
+        with fs_for(account_handler).open_input_stream(f'{ns}fstest/data.txt') as fp:
             assert fp.read() == b"testdata"
             assert fp.read() == b""
 
 
 class TestLimitedAccessAccountHandler:
 
-    def test_write_parquet_dataset_with_limited_access(self, limited_access_account_handler):
-        fs = limited_access_account_handler.to_fs()
+    def test_write_parquet_dataset_with_limited_access(self, limited_access_account_handler, ns):
+        fs = fs_for(limited_access_account_handler)
         df = pd.DataFrame([
             {"side": "left", "data": 2}, {"side": "right", "data": 3}
         ])
-        df.to_parquet('sastokenfs/data.pq', partition_cols=['side'], filesystem=fs)
+        df.to_parquet(f'{ns}sastokenfs/data.pq', partition_cols=['side'], filesystem=fs)